@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gemeinsamer Kern der Archiv-Skripte (vorher vier fast identische Kopien).
+
+Modi:
+  --immediate    Sink + FFmpeg starten, Chromecast suchen, sofort abspielen
+  --remote       Receiver-App starten, „start“ von der TV-Fernbedienung abwarten
+  --wait-button  erst auf den Button-Klick der Receiver-UI warten (90 s),
+                 danach Sink + FFmpeg
+
+--hls liefert statt fMP4 über "-listen 1" HLS-Segmente (1 s) aus einem
+Laufzeitverzeichnis. Die alten Skriptnamen sind dünne Shims auf run(mode).
+"""
+import os, sys, json, time, shutil, signal, argparse, functools, threading, subprocess, http.server
+from concurrent.futures import ThreadPoolExecutor
+
+import pychromecast
+from pychromecast.controllers import BaseController
+from pychromecast.error import UnsupportedNamespace
+from hw_probe import detect_hwaccel, has_filter
+from pulse_sink import get_default_sink, load_null_sink, restore_sinks
+from net_util import local_ip_for, wait_for_port
+
+# ————— CONFIGURATION —————
+PORT                   = 8090
+FPS                    = 30
+GOP                    = FPS * 2      # keyframe every 2s
+RESOLUTION             = "1920x1080"
+DISPLAY                = os.environ.get("DISPLAY", ":0")
+NULL_SINK_NAME         = "cast_sink"
+CUSTOM_RECEIVER_APP_ID = "22B2DA66"   # ← your Custom Receiver App ID here
+STREAM_NS              = "urn:x-cast:com.example.stream"
+BUTTON_TIMEOUT         = 90
+HLS_DIR                = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", "cast-hls")
+HLS_TYPE               = "application/vnd.apple.mpegurl"
+LAST_CAST              = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", "cast-last.json")
+# ————————————————————————
+
+MODES = ("immediate", "remote", "wait")
+
+ffmpeg_proc   = None
+pa_module_idx = None
+original_sink = None
+cast          = None   # nur im remote-Modus gesetzt: cleanup() stoppt dann auch die App
+mc            = None
+stream_url    = None
+stream_type   = "video/mp4"
+hls_server    = None
+
+
+def cleanup(signum=None, frame=None):
+    print("\n🛑 Shutting down gracefully…")
+    if mc:
+        try:
+            print("⏹️  Stopping Chromecast playback...")
+            mc.stop()
+        except Exception as e:
+            print(f"⚠️  Error stopping media: {e}")
+    if cast:
+        try:
+            print("🚪 Quitting custom receiver app...")
+            cast.quit_app()
+        except Exception as e:
+            print(f"⚠️  Error quitting app: {e}")
+
+    if ffmpeg_proc and ffmpeg_proc.poll() is None:
+        print("🔌 Terminating FFmpeg server...")
+        ffmpeg_proc.terminate()
+        try:
+            ffmpeg_proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            ffmpeg_proc.kill()
+
+    if hls_server:
+        hls_server.shutdown()
+        shutil.rmtree(HLS_DIR, ignore_errors=True)
+
+    if original_sink or pa_module_idx:
+        print("🔊 Restoring PulseAudio default sink, unloading null sink...")
+        restore_sinks(original_sink, pa_module_idx)
+
+    print("✅ Cleanup complete. Goodbye!")
+    sys.exit(0)
+
+
+# ————— Receiver-Nachrichten —————
+class StreamController(BaseController):
+    """remote: startet die Wiedergabe bei jedem „start“ der Fernbedienung."""
+    def __init__(self):
+        super().__init__(STREAM_NS)
+
+    def receive_message(self, message, data):
+        print(f"[RECEIVED on {STREAM_NS}] message={message}")
+        print(f"[RECEIVED on {STREAM_NS}] data={data}")
+        sys.stdout.flush()
+
+        if data.get("type") == "debug":
+            print(f"[RECEIVER DEBUG] {data.get('msg')}")
+        elif data.get("type") == "start":
+            print("▶️  Remote requested stream—starting playback!")
+            mc.play_media(stream_url, stream_type)
+            mc.block_until_active(timeout=10)
+            print("🔴 Now streaming… Ctrl+C to stop.")
+        else:
+            print(f"[RECEIVER] Unhandled message type: {data.get('type')}")
+        sys.stdout.flush()
+        return True
+
+
+class ClickController(BaseController):
+    """wait: setzt nur ein Event beim ersten „start“."""
+    def __init__(self):
+        super().__init__(STREAM_NS)
+        self.event = threading.Event()
+
+    def receive_message(self, _msg, data, **kw):
+        if isinstance(data, str):
+            # nur "start" interessiert: alles andere verwerfen, ohne zu parsen
+            if '"start"' not in data: return False
+            try: data = json.loads(data)
+            except json.JSONDecodeError: return False
+        if isinstance(data, dict) and data.get("type") == "start":
+            print("🟢  Receiver‑UI meldet Button‑Klick!")
+            self.event.set(); return True
+        return False
+
+
+# ————— Hardware, PulseAudio, FFmpeg —————
+def detect_hardware_info():
+    """Detect CPU model and GPU(s) via lspci."""
+    cpu_model = None
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    cpu_model = line.split(':', 1)[1].strip()
+                    break
+    except Exception:
+        pass
+
+    gpu_info = []
+    try:
+        out = subprocess.run(
+            ['lspci'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, check=True
+        ).stdout
+        for line in out.splitlines():
+            if 'VGA' in line or '3D controller' in line:
+                gpu_info.append(line.strip())
+    except Exception:
+        pass
+
+    return cpu_model, gpu_info
+
+
+def setup_null_sink():
+    """Create null sink and route all audio into it."""
+    global pa_module_idx, original_sink
+    original_sink = get_default_sink()
+    pa_module_idx = load_null_sink(NULL_SINK_NAME)
+    return f"{NULL_SINK_NAME}.monitor"
+
+
+# argv-Bausteine einmal beim Import (Konstanten, str() schon erledigt);
+# build_ffmpeg_cmd setzt nur noch zusammen
+
+# kein -re: x11grab liefert schon in Echtzeit, -re drosselt nur zusätzlich.
+# Pro Eingang: große Queue gegen "Thread message queue blocking", kein
+# Probing (Format ist bekannt) → Start in Millisekunden statt Sekunden
+# Bitratendeckel fürs WLAN: 8 Mbit/s bei 1080p30, skaliert mit RESOLUTION/FPS
+_W, _H = map(int, RESOLUTION.split("x"))
+_MAXRATE = max(1000, round(8000 * _W * _H * FPS / (1920 * 1080 * 30)))  # kbit/s
+_CAP = ("-maxrate", f"{_MAXRATE}k", "-bufsize", f"{2 * _MAXRATE}k")
+_LIVE_IN = ("-thread_queue_size", "1024", "-probesize", "32", "-analyzeduration", "0")
+_HEAD = (
+    "ffmpeg", "-hide_banner", "-loglevel", "info",
+    "-filter_threads", "2", "-filter_complex_threads", "2",
+    *_LIVE_IN,
+    "-f", "x11grab", "-framerate", str(FPS),
+    "-video_size", RESOLUTION, "-i", DISPLAY,
+    *_LIVE_IN,
+    "-f", "pulse", "-i",   # + Audioquelle
+)
+_ENCODERS = {
+    # CQP kennt keinen Deckel: VBR mit Ziel- und Maximalrate
+    # (-vf je nach ffmpeg-Build in build_ffmpeg_cmd)
+    "vaapi": ("-vaapi_device", "/dev/dri/renderD128",
+              "-c:v", "h264_vaapi", "-rc_mode", "VBR", "-b:v", f"{_MAXRATE * 3 // 4}k", *_CAP),
+    # einmal hochladen, Farbkonvertierung auf der GPU (wie python/cast_stream.py)
+    "cuda":  ("-init_hw_device", "cuda=cu:0", "-filter_hw_device", "cu",
+              "-vf", "hwupload_cuda,scale_cuda=format=nv12",
+              "-c:v", "h264_nvenc", "-preset", "p1", "-rc", "vbr", "-cq", "23", "-b:v", "0",
+              "-rc-lookahead", "0", *_CAP),
+    # ICQ (-global_quality) ignoriert maxrate: VBR
+    "qsv":   ("-c:v", "h264_qsv", "-b:v", f"{_MAXRATE * 3 // 4}k", *_CAP),
+    # keine B-Frames, ein Referenzframe, kein Sync-Lookahead: nichts puffert Frames
+    None:    ("-c:v", "libx264", "-preset", "superfast", "-tune", "zerolatency",
+              "-bf", "0", "-refs", "1", "-crf", "20", *_CAP, "-pix_fmt", "yuv420p",
+              "-x264-params", "sliced-threads=1:sync-lookahead=0"),
+}
+_TAIL_MP4 = (
+    "-threads", "0",
+    "-g", str(GOP), "-keyint_min", str(GOP),
+    "-c:a", "aac", "-b:a", "192k",
+    "-f", "mp4",
+    "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+    "-listen", "1", f"http://0.0.0.0:{PORT}/",
+)
+# HLS schneidet nur an Keyframes: GOP = Segmentlänge (1 s)
+_TAIL_HLS = (
+    "-threads", "0",
+    "-g", str(FPS), "-keyint_min", str(FPS),
+    "-c:a", "aac", "-b:a", "192k",
+    "-f", "hls", "-hls_time", "1", "-hls_list_size", "3",
+    "-hls_flags", "delete_segments+omit_endlist+independent_segments",
+    "-hls_segment_type", "mpegts",
+    os.path.join(HLS_DIR, "index.m3u8"),
+)
+
+
+def build_ffmpeg_cmd(audio_src, hwaccel, hls=False):
+    """Construct an FFmpeg commandline with optimal encoding settings."""
+    enc = _ENCODERS.get(hwaccel, _ENCODERS[None])
+    if hwaccel == "vaapi":
+        # ohne scale_vaapi: NV12 doch auf der CPU konvertieren, dann hochladen
+        vf = "hwupload,scale_vaapi=format=nv12" if has_filter("scale_vaapi") else "format=nv12,hwupload"
+        enc = (*enc, "-vf", vf)
+    return [*_HEAD, audio_src, *enc, *(_TAIL_HLS if hls else _TAIL_MP4)]
+
+
+class HLSHandler(http.server.SimpleHTTPRequestHandler):
+    extensions_map = {**http.server.SimpleHTTPRequestHandler.extensions_map,
+                      ".m3u8": HLS_TYPE, ".ts": "video/mp2t"}
+
+    def end_headers(self):
+        # Receiver holt Playlist/Segmente per XHR (CORS); Playlist nie cachen
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-cache")
+        super().end_headers()
+
+    def log_message(self, *a):
+        pass
+
+
+def serve_hls():
+    """HLS_DIR frisch anlegen und per http.server auf PORT ausliefern."""
+    global hls_server
+    shutil.rmtree(HLS_DIR, ignore_errors=True)
+    os.makedirs(HLS_DIR)
+    hls_server = http.server.ThreadingHTTPServer(
+        ("0.0.0.0", PORT), functools.partial(HLSHandler, directory=HLS_DIR))
+    threading.Thread(target=hls_server.serve_forever, daemon=True).start()
+
+
+def wait_for_playlist(timeout=10.0):
+    playlist = os.path.join(HLS_DIR, "index.m3u8")
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
+        if os.path.exists(playlist):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def start_ffmpeg(audio_src, hw, hls=False):
+    global ffmpeg_proc
+    print(f"⚙️  Hardware acceleration: {hw or 'none (software)'}")
+    # kill stale FFmpeg
+    subprocess.run(
+        ["pkill", "-f", f"ffmpeg.*-listen.*{PORT}"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    print("▶️ Starting FFmpeg server…")
+    if hls:
+        serve_hls()
+    ffmpeg_proc = subprocess.Popen(build_ffmpeg_cmd(audio_src, hw, hls))
+    if hls:
+        # erste Segment-Playlist liegt erst nach ~1 s (hls_time) vor
+        if not wait_for_playlist():
+            print("⚠️  FFmpeg hat nach 10 s noch keine HLS-Playlist geschrieben")
+    elif not wait_for_port(PORT):
+        print(f"⚠️  FFmpeg lauscht nach 5 s noch nicht auf Port {PORT}")
+
+
+def print_hardware_summary():
+    cpu, gpus = detect_hardware_info()
+    print(f"🔧 CPU: {cpu or 'Unknown'}")
+    print("🖥️  GPU(s):")
+    for g in gpus or ["None detected"]:
+        print("   -", g)
+
+
+def discover():
+    """Wie get_chromecasts(), aber das zuletzt benutzte Gerät zuerst direkt (ohne mDNS)."""
+    cc = None
+    try:
+        with open(LAST_CAST) as f:
+            last = json.load(f)
+        # Name mitgeben: direkt verbundene Casts kennen ihn sonst nicht
+        cc = pychromecast.get_chromecast_from_host(
+            (last["host"], last["port"], None, None, last["name"]), tries=1, timeout=2)
+        cc.wait(timeout=2)   # wirft bei Timeout (RequestTimeout)
+        if cc.status is not None:
+            return [cc]
+    except Exception:
+        pass
+    if cc is not None:
+        # sonst verbindet sich der Socket-Client weiter mit der alten Adresse
+        cc.disconnect()
+    return pychromecast.get_chromecasts()[0]
+
+
+def connect(chromecasts):
+    """Ersten Chromecast verbinden; liefert (cast, host, port)."""
+    if not chromecasts:
+        print("⚠️ No Chromecast found. Exiting.")
+        cleanup()
+    cc = chromecasts[0]
+    cc.wait()
+    host = getattr(cc, "host", None) or cc.socket_client.host
+    port = getattr(cc, "port", None) or cc.socket_client.port
+    name = cc.device.friendly_name
+    print(f"✅ Found Chromecast: {name} @ {host}:{port}")
+    try:
+        if not name:
+            # ohne Namen den gespeicherten behalten (gleiches Gerät)
+            with open(LAST_CAST) as f:
+                last = json.load(f)
+            name = last["name"] if (last["host"], last["port"]) == (host, port) else None
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    try:
+        with open(LAST_CAST, "w") as f:
+            json.dump({"host": host, "port": port, "name": name}, f)
+    except OSError:
+        pass
+    return cc, host, port
+
+
+def launch_receiver(cc):
+    if not CUSTOM_RECEIVER_APP_ID:
+        return
+    print(f"🚀 Launching custom receiver ({CUSTOM_RECEIVER_APP_ID})…")
+    try:
+        # start_app blockiert bis zur Launch-Antwort; play_media wartet selbst
+        # auf den Media-Namespace, eine feste Pause ist nicht nötig
+        cc.start_app(CUSTOM_RECEIVER_APP_ID)
+    except Exception as e:
+        print(f"⚠️  Error launching custom receiver: {e}")
+
+
+def media_controller(cc):
+    m = cc.media_controller
+    try:
+        m.update_status()
+    except UnsupportedNamespace:
+        pass
+    return m
+
+
+# ————— Modi —————
+def run(mode="immediate", hls=False):
+    global cast, mc, stream_url, stream_type
+    if mode not in MODES:
+        raise ValueError(f"unknown mode {mode!r} (expected one of {MODES})")
+    for sig in (signal.SIGINT, signal.SIGTERM): signal.signal(sig, cleanup)
+
+    # ffmpeg-Probe (und außer bei wait die mDNS-Suche) laufen parallel zum Rest
+    pool = ThreadPoolExecutor(max_workers=2)
+    hw_fut = pool.submit(detect_hwaccel)
+    disc_fut = pool.submit(discover) if mode != "wait" else None
+    pool.shutdown(wait=False)
+
+    if mode == "wait":
+        # Sink erst nach dem Klick, sonst wäre das Desktop-Audio bis zu 90 s stumm
+        print("🔍 Discovering Chromecast…")
+        cc, host, port = connect(discover())
+        cc.quit_app()                          # laufende App beenden
+        launch_receiver(cc)
+        ctrl = ClickController(); cc.register_handler(ctrl)
+        print(f"📺  Receiver‑UI steht. Warte {BUTTON_TIMEOUT} s auf Button …")
+        if not ctrl.event.wait(timeout=BUTTON_TIMEOUT):
+            print("⏳  Timeout – kein Button‑Klick empfangen.")
+            cleanup()
+        print("🔊 Setting up audio capture…")
+        audio_src = setup_null_sink()
+        print(f"⤷ Capturing from: {audio_src}")
+        start_ffmpeg(audio_src, hw_fut.result(), hls)
+    else:
+        print_hardware_summary()
+        print("🔊 Setting up audio capture…")
+        audio_src = setup_null_sink()
+        print(f"⤷ Capturing from: {audio_src}")
+        start_ffmpeg(audio_src, hw_fut.result(), hls)
+        print("🔍 Discovering Chromecast…")
+        cc, host, port = connect(disc_fut.result())
+        launch_receiver(cc)
+
+    m = media_controller(cc)
+    url = f"http://{local_ip_for(host, port)}:{PORT}/" + ("index.m3u8" if hls else "")
+    stream_type = HLS_TYPE if hls else "video/mp4"
+
+    if mode == "remote":
+        cast, mc, stream_url = cc, m, url
+        cc.register_handler(StreamController())
+        print(f"\n📺 Stream ready at {stream_url}")
+        print("⏸️  Waiting for you to press ‘Stream’ on the TV remote menu…")
+    else:
+        print(f"📺 Casting → {url}")
+        m.play_media(url, stream_type)
+        m.block_until_active(timeout=10)
+        print("🔴 Streaming… Press Ctrl+C to stop.")
+
+    # block until SIGINT/SIGTERM (cleanup exits), no periodic wakeups
+    while True:
+        signal.pause()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Desktop → Chromecast (Archiv-Variante)")
+    g = ap.add_mutually_exclusive_group()
+    g.add_argument("--immediate", dest="mode", action="store_const", const="immediate",
+                   help="sofort abspielen (Default)")
+    g.add_argument("--remote", dest="mode", action="store_const", const="remote",
+                   help="auf „Stream“ der TV-Fernbedienung warten")
+    g.add_argument("--wait-button", dest="mode", action="store_const", const="wait",
+                   help=f"erst nach Button-Klick (max. {BUTTON_TIMEOUT} s) Sink + FFmpeg starten")
+    ap.add_argument("--hls", action="store_true",
+                    help="HLS (1-s-Segmente) statt fragmentiertem MP4 ausliefern")
+    args = ap.parse_args()
+    run(args.mode or "immediate", args.hls)
+
+
+if __name__ == "__main__":
+    main()
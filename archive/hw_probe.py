@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gemeinsame HW-Accel-Erkennung der Archiv-Skripte.
+
+`ffmpeg -hide_banner -hwaccels/-encoders/-filters` werden pro Prozess einmal (lru_cache)
+und pro Sitzung einmal ($XDG_RUNTIME_DIR, Schlüssel: mtime des ffmpeg-Binaries)
+abgefragt.
+"""
+import os, json, shutil, subprocess, functools
+
+CACHE = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}",
+                     "chromecast_hwaccel.json")
+
+# Abfrage -> (ffmpeg-Argument, Namensspalte statt ganzer Zeile)
+PROBES = {
+    "methods":  ("-hwaccels", False),
+    "encoders": ("-encoders", True),
+    "filters":  ("-filters", True),
+}
+
+def _probe(arg, column):
+    out = subprocess.run(
+        ["ffmpeg", "-hide_banner", arg],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, check=True
+    ).stdout
+    lines = [l.strip() for l in out.splitlines()]
+    if column:  # "<flags> <name> …"; Legende hat "=" an Stelle 2
+        return {p[1] for p in map(str.split, lines[1:]) if len(p) > 2 and p[1] != "="}
+    # erst nach der Überschrift lesen, egal was ffmpeg davor ausgibt
+    head = "Hardware acceleration methods:"
+    start = lines.index(head) + 1 if head in lines else 1
+    return {l for l in lines[start:] if l}
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_caps():
+    """{methods, encoders, filters} als sets; None = Abfrage gescheitert (unbekannt)."""
+    try:
+        key = str(os.stat(shutil.which("ffmpeg")).st_mtime_ns)
+    except (TypeError, OSError):
+        key = None
+    if key:
+        try:
+            with open(CACHE) as f:
+                cached = json.load(f)
+            if cached.get("key") == key and all(n in cached for n in PROBES):
+                return {n: set(cached[n]) for n in PROBES}
+        except (OSError, ValueError, TypeError):
+            pass
+    caps = {}
+    for name, (arg, column) in PROBES.items():
+        try:
+            caps[name] = _probe(arg, column)
+        except Exception:
+            caps[name] = None
+    if key and all(v is not None for v in caps.values()):
+        try:
+            with open(CACHE, "w") as f:
+                json.dump({"key": key, **{n: sorted(v) for n, v in caps.items()}}, f)
+        except OSError:
+            pass
+    return caps
+
+def has_filter(name):
+    """True, wenn ffmpeg den Filter kennt (oder die Abfrage scheiterte)."""
+    filters = ffmpeg_caps()["filters"]
+    return filters is None or name in filters
+
+@functools.lru_cache(maxsize=None)
+def detect_hwaccel():
+    """Return best hwaccel: 'vaapi', 'cuda', 'qsv', or None."""
+    caps = ffmpeg_caps()
+    methods, encoders = caps["methods"] or set(), caps["encoders"]
+    # hwaccel allein reicht nicht: der passende H.264-Encoder muss einkompiliert sein
+    def has(enc): return encoders is None or enc in encoders
+
+    # prioritize
+    if "vaapi" in methods and has("h264_vaapi") and os.path.exists("/dev/dri/renderD128"):
+        return "vaapi"
+    if any(m in methods for m in ("cuda", "nvenc")) and has("h264_nvenc"):
+        return "cuda"
+    if "qsv" in methods and has("h264_qsv"):
+        return "qsv"
+    return None
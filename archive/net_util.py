@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gemeinsame Netzwerk-Helfer der Archiv-Skripte.
+
+Die lokale IP wird per `ip -j route get` (prefsrc) bestimmt und pro Prozess
+gecacht; ohne iproute2 wie bisher über den UDP-connect-Trick. wait_for_port()
+wartet auf den LISTEN-Socket von ffmpeg statt einer festen Pause.
+"""
+import json, time, socket, subprocess, functools
+
+@functools.lru_cache(maxsize=8)
+def local_ip_for(host, port):
+    """Lokale IPv4, über die host erreicht wird."""
+    try:
+        out = subprocess.run(["ip", "-j", "route", "get", host], text=True,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             check=True).stdout
+        return json.loads(out)[0]["prefsrc"]
+    except Exception:
+        pass
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.connect((host, port))
+        return s.getsockname()[0]
+
+def port_listening(port):
+    """True, wenn ein Socket im LISTEN-Zustand auf port liegt (/proc/net/tcp{,6})."""
+    hexport = f"{port:04X}"
+    for path in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(path) as f:
+                next(f)  # Header
+                for line in f:
+                    local, st = line.split()[1], line.split()[3]
+                    if st == "0A" and local.rsplit(":", 1)[1] == hexport:
+                        return True
+        except OSError:
+            pass
+    return False
+
+def wait_for_port(port, timeout=5.0):
+    # kein Test-connect(): "-listen 1" bedient genau einen Client
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
+        if port_listening(port):
+            return True
+        time.sleep(0.02)
+    return False
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gemeinsames PulseAudio-Setup der Archiv-Skripte.
+
+Mit `pulsectl` laufen Abfragen und module-load/unload direkt über libpulse
+(kein fork/exec, kein Parsen der pactl-Ausgabe); ohne pulsectl wie bisher pactl.
+"""
+import shlex, subprocess
+
+def _pulse():
+    try:
+        import pulsectl
+        return pulsectl.Pulse("cast-archive")
+    except Exception:
+        return None
+
+def get_default_sink():
+    pulse = _pulse()
+    if pulse:
+        try:
+            with pulse: return pulse.server_info().default_sink_name
+        except Exception:
+            pass
+    out = subprocess.run(["pactl", "info"], text=True,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    for line in out.splitlines():
+        if line.startswith("Default Sink:"):
+            return line.split(":", 1)[1].strip()
+    return None
+
+def load_null_sink(name):
+    """Null-Sink laden und zum Default machen; liefert den Modul-Index (str)."""
+    pulse = _pulse()
+    if pulse:
+        try:
+            with pulse:
+                idx = pulse.module_load("module-null-sink",
+                                        f"sink_name={name} sink_properties=device.description=ChromecastSink")
+                pulse.default_set(pulse.get_sink_by_name(name))
+            return str(idx)
+        except Exception:
+            pass
+    idx = subprocess.run(
+        ["pactl", "load-module", "module-null-sink",
+         f"sink_name={name}",
+         "sink_properties=device.description=ChromecastSink"],
+        text=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.strip()
+    subprocess.run(["pactl", "set-default-sink", name],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return idx
+
+def restore_sinks(original, idx):
+    """Alten Default-Sink zurücksetzen und das Null-Sink-Modul entladen."""
+    pulse = _pulse()
+    if pulse:
+        try:
+            with pulse:
+                if original: pulse.default_set(pulse.get_sink_by_name(original))
+                if idx:      pulse.module_unload(int(idx))
+            return
+        except Exception:
+            pass
+    # beide pactl-Aufrufe in einem Fork; pactl selbst liest keine Befehle von stdin
+    cmds = []
+    if original: cmds.append(f"pactl set-default-sink {shlex.quote(original)}")
+    if idx:      cmds.append(f"pactl unload-module {shlex.quote(idx)}")
+    if cmds:
+        try:
+            subprocess.run(["sh", "-c", "; ".join(cmds)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            pass  # Aufräumen darf an fehlender Shell nicht scheitern
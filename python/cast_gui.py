@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, sys, subprocess, threading, queue, signal, configparser, shutil, re, shlex, time
+import os, sys, subprocess, threading, queue, signal, configparser, shutil, re, shlex, time, socket
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
@@ -13,32 +13,32 @@ CONFIG_LOCAL = os.path.abspath(os.path.join(HERE, "..", "config.local.ini"))
 def load_cfg():
     cfg = configparser.ConfigParser()
     cfg.read([CONFIG_USER, CONFIG_LOCAL])
-    c = cfg["cast"] if "cast" in cfg else {}
-    s = cfg["stream"] if "stream" in cfg else {}
-    v = cfg["virtual"] if "virtual" in cfg else {}
-    n = cfg["net"] if "net" in cfg else {}
+    # jede Sektion einmal in ein dict; danach nur noch dict-Lookups statt
+    # configparser-Zugriff (Interpolation, try/except) pro Schlüssel
+    def section(name):
+        if not cfg.has_section(name):
+            return {}
+        try:
+            return dict(cfg.items(name))
+        except configparser.Error:
+            return dict(cfg.items(name, raw=True))
+    c, s, v, n = (section(x) for x in ("cast", "stream", "virtual", "net"))
     getenv_disp = os.environ.get("DISPLAY", ":0")
 
     def geti(sec, key, default=""):
-        try:
-            return (sec.get(key) if hasattr(sec, "get") else default) or default
-        except Exception:
-            return default
+        return sec.get(key) or default
     def geti_int(sec, key, default):
         try:
             return int(geti(sec, key, default))
-        except Exception:
+        except ValueError:
             return default
     def geti_float(sec, key, default):
         try:
             return float(geti(sec, key, default))
-        except Exception:
+        except ValueError:
             return default
     def geti_bool(sec, key, default=False):
-        try:
-            return str(geti(sec, key, str(default))).lower() == "true"
-        except Exception:
-            return default
+        return str(geti(sec, key, str(default))).lower() == "true"
 
     return {
         "mode":       geti(s, "mode", "direct"),
@@ -115,6 +115,17 @@ def save_cfg(d):
 def validate_display(disp: str) -> bool:
     if not disp:
         return False
+    # lokales ":N[.S]": nimmt das X-Socket Verbindungen an, ist kein xdpyinfo-Fork
+    # nötig; verwaiste Sockets (abgestürzter Server) prüft weiter xdpyinfo
+    m = re.fullmatch(r":(\d+)(?:\.\d+)?", disp)
+    if m:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.settimeout(1)
+                s.connect(f"/tmp/.X11-unix/X{m.group(1)}")
+            return True
+        except OSError:
+            pass
     if shutil.which("xdpyinfo") is None:
         return True
     try:
@@ -503,7 +514,7 @@ class App(tk.Tk):
                 text=True,
                 encoding="utf-8",
                 errors="replace",
-                preexec_fn=os.setsid
+                start_new_session=True
             )
         except Exception as e:
             messagebox.showerror("Fehler", str(e)); self.proc=None; return
@@ -10,83 +10,260 @@ und Latenz-Presets.
 - Latenz: normal / low / ultra (wirkt auf FFmpeg-Muxer/Encoder-Flags & GOP)
 - setzt Media stream_type=LIVE, damit der CC möglichst wenig puffert
 - beendet ffmpeg/WM/X-Server sauber bei SIGINT/SIGTERM
+- optional --relay: fMP4 über eigenen HTTP/1.1-Server (chunked, TCP_NODELAY,
+  Reconnect möglich) statt ffmpeg -listen 1
 """
-import os, sys, time, socket, signal, subprocess, argparse, shutil, re
-import threading
-import pychromecast
-from pychromecast.error import UnsupportedNamespace
+import os, time, socket, signal, subprocess, argparse, shutil, re
+import functools, json, shlex, ctypes, select, struct, fcntl
+import threading, concurrent.futures, queue, http.server
+from dataclasses import dataclass
 
 # -------------- Defaults --------------
 DEFAULT_APP_ID = "22B2DA66"
 DEFAULT_NS     = "urn:x-cast:com.example.stream"
 
-# -------------- Utils --------------
-def shlex_join(parts):
-    import shlex
-    return " ".join(shlex.quote(p) for p in parts)
+_DIM_RE = re.compile(r"dimensions:\s+(\d+)x(\d+)\s+pixels")
+_DEFAULT_SINK_RE = re.compile(rb"^Default Sink:[ \t]*(\S.*?)\s*$", re.M)
 
+# -------------- Utils --------------
 def run_ok(cmd, **kw):
     return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, **kw)
 
+@functools.lru_cache(maxsize=None)
 def which(p): return shutil.which(p) is not None
 
 def debug(msg): print(msg, flush=True)
 
+def background(fn, *args):
+    """fn(*args) in einem Daemon-Thread starten; Ergebnis als Future.
+    Daemon statt ThreadPoolExecutor: hängende mDNS-Suche blockiert den Exit nicht."""
+    fut = concurrent.futures.Future()
+    def run():
+        try: fut.set_result(fn(*args))
+        except BaseException as e: fut.set_exception(e)
+    threading.Thread(target=run, daemon=True).start()
+    return fut
+
 # -------------- Audio (Pulse) --------------
+# -------------- PulseAudio --------------
+def pulse_client():
+    """pulsectl-Verbindung (libpulse, kein fork/exec), oder None -> pactl-Fallback."""
+    try:
+        import pulsectl
+        return pulsectl.Pulse("cast-stream")
+    except Exception:
+        return None
+
 def get_default_sink():
+    pulse = pulse_client()
+    if pulse:
+        try:
+            with pulse: return pulse.server_info().default_sink_name
+        except Exception:
+            pass
     try:
-        out = run_ok(["pactl","info"]).stdout
-        for line in out.splitlines():
-            if line.startswith("Default Sink:"):
-                return line.split(":",1)[1].strip()
+        res = run_ok(["pactl","-f","json","info"])
+        if res.returncode == 0:
+            return json.loads(res.stdout).get("default_sink_name")
+    except Exception:
+        pass
+    # ältere pactl ohne -f json: Regex direkt auf den Bytes, ohne Dekodieren/Zeilenliste
+    try:
+        out = subprocess.run(["pactl","info"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+        m = _DEFAULT_SINK_RE.search(out)
+        if m: return m.group(1).decode()
     except Exception:
         pass
     return None
 
 def setup_null_sink(name):
     original = get_default_sink()
-    idx = run_ok(["pactl","load-module","module-null-sink",
-                  f"sink_name={name}","sink_properties=device.description=ChromecastSink"]).stdout.strip()
-    subprocess.run(["pactl","set-default-sink",name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    pulse = pulse_client()
+    if pulse:
+        try:
+            with pulse:
+                idx = pulse.module_load("module-null-sink",
+                                       f"sink_name={name} sink_properties=device.description=ChromecastSink")
+                pulse.default_set(pulse.get_sink_by_name(name))
+            return original, str(idx), f"{name}.monitor"
+        except Exception:
+            pass
+    # load-module + set-default-sink in einem Aufruf; stdout ist der Modul-Index
+    script = (f"pactl load-module module-null-sink {shlex.quote('sink_name=' + name)} "
+              f"sink_properties=device.description=ChromecastSink "
+              f"&& exec pactl set-default-sink {shlex.quote(name)} >/dev/null 2>&1")
+    idx = run_ok(["sh","-c",script]).stdout.strip()
     return original, idx, f"{name}.monitor"
 
 def restore_sinks(original, idx):
-    try:
-        if original: subprocess.run(["pactl","set-default-sink",original], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    finally:
-        if idx: subprocess.run(["pactl","unload-module",idx], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    pulse = pulse_client()
+    if pulse:
+        try:
+            with pulse:
+                if original: pulse.default_set(pulse.get_sink_by_name(original))
+                if idx:      pulse.module_unload(int(idx))
+            return
+        except Exception:
+            pass
+    cmds = []
+    if original: cmds.append(f"pactl set-default-sink {shlex.quote(original)}")
+    if idx:      cmds.append(f"pactl unload-module {shlex.quote(idx)}")
+    if cmds:
+        subprocess.run(["sh","-c","; ".join(cmds)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 # -------------- HW accel --------------
+FFMPEG_CAPS_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                                 "chromecast-streamer", "ffmpeg-caps.json")
+
+def _probe_list(args, column=False):
+    """ffmpeg-Listenausgabe als set (Zeilen bzw. Namensspalte ohne Legende), oder None."""
+    res = run_ok(["ffmpeg","-hide_banner",*args])
+    if res.returncode != 0:
+        return None
+    lines = res.stdout.splitlines()[1:]
+    if column:  # -encoders/-filters: "<flags> <name> …"; Legende hat "=" an Stelle 2
+        return {p[1] for p in map(str.split, lines) if len(p) > 2 and p[1] != "="}
+    return {l.strip() for l in lines if l.strip()}
+
+# Abfrage -> (ffmpeg-Argumente, Namensspalte statt ganzer Zeile)
+FFMPEG_PROBES = {
+    "hwaccels": (["-hwaccels"], False),
+    "encoders": (["-encoders"], True),
+    "filters":  (["-filters"], True),
+    "devices":  (["-devices"], True),
+}
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_caps():
+    """
+    {hwaccels, encoders, filters, devices} von ffmpeg als sets, auf Platte gecacht
+    (Schlüssel: mtime des ffmpeg-Binaries). None = Abfrage gescheitert (unbekannt).
+    """
+    try:
+        key = str(os.stat(shutil.which("ffmpeg")).st_mtime_ns)
+    except (TypeError, OSError):
+        key = None
+    if key:
+        try:
+            with open(FFMPEG_CAPS_CACHE) as f:
+                cached = json.load(f)
+            if cached.get("key") == key and all(n in cached for n in FFMPEG_PROBES):
+                return {n: set(cached[n]) for n in FFMPEG_PROBES}
+        except (OSError, ValueError, TypeError):
+            pass
+    caps = {}
+    for name, (args, column) in FFMPEG_PROBES.items():
+        try:
+            caps[name] = _probe_list(args, column)
+        except Exception:
+            caps[name] = None
+    if key and all(v is not None for v in caps.values()):
+        try:
+            os.makedirs(os.path.dirname(FFMPEG_CAPS_CACHE), exist_ok=True)
+            with open(FFMPEG_CAPS_CACHE, "w") as f:
+                json.dump({"key": key, **{n: sorted(v) for n, v in caps.items()}}, f)
+        except OSError:
+            pass
+    return caps
+
+@functools.lru_cache(maxsize=None)
 def detect_hwaccel():
+    caps = ffmpeg_caps()
+    methods, encoders = caps["hwaccels"] or set(), caps["encoders"]
+    # hwaccel allein reicht nicht: der passende H.264-Encoder muss einkompiliert sein
+    def has(enc): return encoders is None or enc in encoders
+    if "vaapi" in methods and has("h264_vaapi") and os.path.exists("/dev/dri/renderD128"): return "vaapi"
+    if any(m in methods for m in ("cuda","nvenc")) and has("h264_nvenc"): return "cuda"
+    if "qsv" in methods and has("h264_qsv"): return "qsv"
+    return None
+
+def has_cap_sys_admin():
+    # kmsgrab braucht CAP_SYS_ADMIN (Bit 21 in CapEff)
     try:
-        out = run_ok(["ffmpeg","-hwaccels"]).stdout.splitlines()[1:]
-        methods = {l.strip() for l in out if l.strip()}
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("CapEff:"):
+                    return bool(int(line.split()[1], 16) & (1 << 21))
     except Exception:
-        methods = set()
-    if "vaapi" in methods and os.path.exists("/dev/dri/renderD128"): return "vaapi"
-    if any(m in methods for m in ("cuda","nvenc")): return "cuda"
-    if "qsv" in methods: return "qsv"
-    return None
+        pass
+    return False
 
 # -------------- Virtual display --------------
 def pick_free_display(start=20, end=98):
     # avoid very low display numbers which xpra warns about
-    for n in range(start, end):
-        if not os.path.exists(f"/tmp/.X11-unix/X{n}"):
-            return f":{n}"
-    raise RuntimeError("No free X display found")
+    # one readdir instead of a stat() per candidate display
+    try:
+        used = {int(e.name[1:]) for e in os.scandir("/tmp/.X11-unix")
+                if e.name.startswith("X") and e.name[1:].isdigit()}
+    except FileNotFoundError:
+        used = set()
+    # Lock-Datei nur für Kandidaten ohne Socket prüfen (meist genau ein stat);
+    # verwaiste /tmp/.X{n}-lock lassen Xvfb/Xephyr sonst erst nach dem Start scheitern
+    n = next((n for n in range(start, end)
+              if n not in used and not os.path.exists(f"/tmp/.X{n}-lock")), None)
+    if n is None:
+        raise RuntimeError("No free X display found")
+    return f":{n}"
+
+IN_CREATE = 0x100
+
+def inotify_x11_watch():
+    """inotify-fd mit IN_CREATE-Watch auf /tmp/.X11-unix, oder None (kein inotify)."""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, b"/tmp/.X11-unix", IN_CREATE) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except Exception:
+        return None
+
+def wait_x_socket(fd, display, timeout=3.0):
+    """Blockiert, bis /tmp/.X11-unix/X<n> angelegt wird. fd schließt der Aufrufer."""
+    name = f"X{display.lstrip(':')}".encode()
+    sock = b"/tmp/.X11-unix/" + name
+    deadline = time.monotonic() + timeout
+    try:
+        while not os.path.exists(sock):
+            left = deadline - time.monotonic()
+            if left <= 0 or not select.select([fd], [], [], left)[0]:
+                return False
+            buf = os.read(fd, 4096)
+            off = 0
+            # struct inotify_event: wd, mask, cookie, len, name[len]
+            while off + 16 <= len(buf):
+                _wd, _mask, _cookie, ln = struct.unpack_from("iIII", buf, off)
+                if buf[off+16:off+16+ln].rstrip(b"\0") == name:
+                    return True
+                off += 16 + ln
+        return True
+    except OSError:
+        return False
 
 def xdpy_size(display):
     if not which("xdpyinfo"): return None
     try:
-        out = run_ok(["xdpyinfo","-display",display]).stdout
-        m = re.search(r"dimensions:\s+(\d+)x(\d+)\s+pixels", out)
+        out = subprocess.check_output(["xdpyinfo","-display",display], stderr=subprocess.DEVNULL, text=True)
+        m = _DIM_RE.search(out)
         if m: return (int(m.group(1)), int(m.group(2)))
     except Exception:
         pass
     return None
 
 def start_virtual(display, res, backend="auto", start_wm=False):
+    # Watch vor dem Start des X-Servers anlegen, damit kein IN_CREATE verloren geht;
+    # der fd wird auch geschlossen, wenn der Start unterwegs scheitert
+    xsock_fd = inotify_x11_watch()
+    try:
+        return _start_virtual(display, res, backend, start_wm, xsock_fd)
+    finally:
+        if xsock_fd is not None:
+            os.close(xsock_fd)
+
+def _start_virtual(display, res, backend, start_wm, xsock_fd):
     # res: "WIDTHxHEIGHT", display: ":N" or "auto"
     W, H = [int(x) for x in str(res).split("x")]
     virt_proc = None
@@ -120,14 +297,15 @@ def start_virtual(display, res, backend="auto", start_wm=False):
         if not which("Xvfb"):
             raise RuntimeError("Xvfb nicht gefunden. Installiere: sudo apt install xvfb")
         args = ["Xvfb", display, "-screen", "0", f"{W}x{H}x24", "-nolisten", "tcp", "-noreset"]
-        p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+        # Ausgabe verwerfen: eine nie gelesene PIPE läuft voll (64 KB) und blockiert den X-Server
+        p = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
         virt_proc = p
         procs.append(p)
     elif chosen == "xephyr":
         if not which("Xephyr"):
             raise RuntimeError("Xephyr nicht gefunden. Installiere: sudo apt install xserver-xephyr")
         args = ["Xephyr", display, "-screen", f"{W}x{H}", "-resizeable", "-ac"]
-        p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+        p = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
         virt_proc = p
         procs.append(p)
     elif chosen == "xpra":
@@ -199,7 +377,7 @@ def start_virtual(display, res, backend="auto", start_wm=False):
                         # depending on a non-existent 'xpra exec' subcommand.
                         env = os.environ.copy()
                         env["DISPLAY"] = display
-                        pterm = subprocess.Popen([term], env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+                        pterm = subprocess.Popen([term], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
                         procs.append(pterm)
                         print(f"[xpra-server] started {term} inside {display}", flush=True)
                     except Exception as e:
@@ -232,7 +410,7 @@ def start_virtual(display, res, backend="auto", start_wm=False):
 
                 fallback_args = ["xpra", "start", display, "--no-daemon"]
                 print("[xpra-server] daemon start didn't register display, falling back to foreground start", flush=True)
-                p = subprocess.Popen(fallback_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+                p = subprocess.Popen(fallback_args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
                 virt_proc = p
                 procs.append(p)
                 # forward server output
@@ -260,13 +438,13 @@ def start_virtual(display, res, backend="auto", start_wm=False):
             if which("Xephyr"):
                 print("[virtual] xpra failed to provide a live server — falling back to Xephyr.", flush=True)
                 args = ["Xephyr", display, "-screen", f"{W}x{H}", "-resizeable", "-ac"]
-                p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+                p = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
                 virt_proc = p
                 procs.append(p)
             elif which("Xvfb"):
                 print("[virtual] xpra failed — falling back to Xvfb.", flush=True)
                 args = ["Xvfb", display, "-screen", "0", f"{W}x{H}x24", "-nolisten", "tcp", "-noreset"]
-                p = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+                p = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
                 virt_proc = p
                 procs.append(p)
             else:
@@ -277,6 +455,10 @@ def start_virtual(display, res, backend="auto", start_wm=False):
     # Warte auf Display bereit (xdpyinfo bevorzugt). For xpra the unix socket may not exist,
     # so prefer xdpyinfo; fall back to assuming requested size after timeout.
     actual = None
+    # erst auf das X-Socket warten (inotify, kein Polling); die Schleife unten
+    # bleibt Fallback für Systeme ohne inotify und für xpra
+    if xsock_fd is not None:
+        wait_x_socket(xsock_fd, display)
     # wait up to 20s for display to be usable
     for _ in range(400):
         try:
@@ -311,7 +493,7 @@ def start_virtual(display, res, backend="auto", start_wm=False):
         if which("openbox"):
             env = os.environ.copy()
             env["DISPLAY"] = display
-            wm_proc = subprocess.Popen(["openbox"], env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+            wm_proc = subprocess.Popen(["openbox"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
         else:
             wm_proc = None
 
@@ -344,7 +526,7 @@ def start_virtual(display, res, backend="auto", start_wm=False):
             if xauth_path:
                 host_env["XAUTHORITY"] = xauth_path
             attach_args = ["xpra", "attach", display]
-            attach_proc = subprocess.Popen(attach_args, env=host_env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+            attach_proc = subprocess.Popen(attach_args, env=host_env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True)
             procs.append(attach_proc)
             # Forward attach output for debugging (non-blocking thread)
             def _forward_attach_output(pipe):
@@ -370,145 +552,592 @@ def start_virtual(display, res, backend="auto", start_wm=False):
     return virt_proc, attach_proc, wm_proc, display, actual, xauth_path
 
 # -------------- Latenz Presets --------------
-def latency_flags(latency, hw_codec, gop_frames):
+def latency_flags(latency, hw_codec, gop_frames, intra_refresh=False):
     """
-    Liefert (extra_input_flags, extra_global_flags, extra_encoder_flags, gop_override)
+    Liefert (extra_input_flags, extra_output_flags, extra_encoder_flags, gop_override).
+    extra_input_flags stehen vor jedem -i (x11grab und pulse).
+    intra_refresh: periodischer Intra-Refresh statt IDR-Frames (x264/nvenc).
     """
-    # Input & global Flags wirken bei allen Codecs
-    base_in = [
-        "-thread_queue_size","1024",  # x11
-    ]
-    base_glob = []
+    base_in = []
+    base_out = []
     base_enc = []
     gop_override = None
 
     if latency == "normal":
-        # robust, guter Kompromiss
-        base_glob += ["-probesize","1M","-analyzeduration","1M"]
-    elif latency == "low":
-        # niedrige Latenz, kleine Puffer, weniger Szene-Analyse
-        base_glob += ["-fflags","nobuffer", "-flags","+low_delay",
-                      "-probesize","64k", "-analyzeduration","0",
-                      "-flush_packets","1", "-sc_threshold","0",
-                      "-use_wallclock_as_timestamps","1"]
-        gop_override = max(1, gop_frames // 2)  # halbe GOP
-    else:  # ultra
-        base_glob += ["-fflags","nobuffer", "-flags","+low_delay",
-                      "-probesize","32k", "-analyzeduration","0",
-                      "-flush_packets","1", "-sc_threshold","0",
-                      "-use_wallclock_as_timestamps","1"]
-        gop_override = max(1, gop_frames // 3)  # sehr kurze GOP
+        # robust, guter Kompromiss; Muxer darf Writes bündeln (weniger send()-Syscalls)
+        base_in  += ["-probesize","1M","-analyzeduration","1M"]
+        base_out += ["-flush_packets","0",
+                     # Fragment pro Keyframe, höchstens 1 s lang, auch bei langer GOP
+                     "-movflags","frag_keyframe+empty_moov+default_base_moof",
+                     "-frag_duration","1000000"]
+    else:
+        # niedrige Latenz: kein Probing/Puffern der Live-Inputs, kein Mux-Delay
+        base_in  += ["-fflags","nobuffer+discardcorrupt", "-flags","low_delay",
+                     "-probesize","32", "-analyzeduration","0",
+                     "-use_wallclock_as_timestamps","1"]
+        base_out += ["-max_delay","0", "-muxdelay","0", "-muxpreload","0",
+                     "-flush_packets","1",
+                     # CMAF-artige Chunks (~100 ms) statt ganzer GOPs: Bytes verlassen
+                     # den Muxer, sobald sie kodiert sind, unabhängig von der GOP-Länge
+                     "-movflags","frag_every_frame+empty_moov+default_base_moof+separate_moof+skip_trailer",
+                     "-frag_duration","100000", "-min_frag_duration","100000",
+                     "-write_prft","wallclock", "-use_editlist","0"]
+        base_enc += ["-sc_threshold","0"]
+        if latency == "low":
+            gop_override = max(1, gop_frames // 2)  # halbe GOP
+        else:  # ultra
+            gop_override = max(1, gop_frames // 3)  # sehr kurze GOP
 
     # Encoder-spezifische Feintuning
+    # libx264: -tune zerolatency ist bereits Default (HW_PROFILES); Preset und
+    # x264-params hängen an der Latenz, da ein explizites rc-lookahead das
+    # zerolatency-Tune wieder aushebelt
     if hw_codec == "libx264":
-        if latency in ("low","ultra"):
-            base_enc += ["-tune","zerolatency"]
+        if latency == "normal":
+            preset, params = "veryfast", "rc-lookahead=10:sync-lookahead=0:bframes=0:sliced-threads=1"
+        else:
+            preset = "ultrafast" if latency == "ultra" else "superfast"
+            params = "rc-lookahead=0:sync-lookahead=0:bframes=0:scenecut=0:open-gop=0:sliced-threads=1"
+        if intra_refresh:
+            # Intra-Refresh-Welle über die GOP statt IDR-Spitzen: konstante Framegröße
+            params += ":intra-refresh=1" + (":scenecut=0" if latency == "normal" else "")
+        base_enc += ["-preset", preset, "-x264-params", params]
     elif hw_codec == "h264_nvenc":
-        # NVENC: Lookahead aus, Low-Latency-Tunes
+        if intra_refresh:
+            base_enc += ["-intra-refresh","1", "-no-scenecut","1", "-strict_gop","1"]
+        # NVENC: Lookahead aus, keine Frame-Verzögerung, Low-Latency-Tunes
         if latency == "low":
-            base_enc += ["-tune","ll","-rc-lookahead","0"]
+            base_enc += ["-tune","ll","-rc-lookahead","0","-delay","0"]
         elif latency == "ultra":
-            base_enc += ["-tune","ull","-rc-lookahead","0"]
+            base_enc += ["-tune","ull","-rc-lookahead","0","-delay","0"]
     elif hw_codec == "h264_vaapi":
         # B-Frames aus = niedrigere Latenz
         base_enc += ["-bf","0"]
+        if latency != "normal":
+            base_enc += ["-async_depth","1"]
     elif hw_codec == "h264_qsv":
         base_enc += ["-look_ahead","0"]
+        if latency != "normal":
+            base_enc += ["-bf","0", "-async_depth","1"]
 
-    return base_in, base_glob, base_enc, gop_override
+    return base_in, base_out, base_enc, gop_override
 
 # -------------- FFmpeg --------------
-def build_ffmpeg_cmd(display, size, fps, hw, gop_s, port, loglevel, sink_name, latency):
-    W,H = map(int, size.split("x"))
-    gop_frames = max(int(fps*max(gop_s, 0.25)), 1)
+# hw → (Encoder, vor dem ersten -i, Filter nach den Inputs, Encoder-Defaults)
+# Bitratendeckel fürs WLAN: 8 Mbit/s bei 1080p30, linear mit der Pixelrate
+MAXRATE_1080P30 = 8000  # kbit/s
 
-    # Encoderwahl
-    enc_name = None
-    vf_pre  = []
-    if   hw=="vaapi":
-        enc_name = "h264_vaapi"
-        vf_pre = ["-vaapi_device","/dev/dri/renderD128","-vf","format=nv12,hwupload"]
-    elif hw=="cuda":
-        enc_name = "h264_nvenc"
-    elif hw=="qsv":
-        enc_name = "h264_qsv"
-    elif hw=="software":
-        enc_name = "libx264"
-    else:
-        det = detect_hwaccel()
-        if det=="vaapi":
-            enc_name = "h264_vaapi"; vf_pre = ["-vaapi_device","/dev/dri/renderD128","-vf","format=nv12,hwupload"]
-        elif det=="cuda":
-            enc_name = "h264_nvenc"
-        elif det=="qsv":
-            enc_name = "h264_qsv"
-        else:
-            enc_name = "libx264"
+def rate_cap(w, h, fps):
+    """maxrate in kbit/s für w×h@fps (mindestens 1 Mbit/s)."""
+    return max(1000, round(MAXRATE_1080P30 * w * h * fps / (1920 * 1080 * 30)))
 
-    in_flags, glob_flags, enc_flags, gop_override = latency_flags(latency, enc_name, gop_frames)
-    gop_use = gop_override or gop_frames
+# Qualitätsmodus je Encoder, aber immer mit -maxrate/-bufsize gedeckelt
+# ({bitrate}/{maxrate}/{bufsize} füllt build_ffmpeg_cmd aus rate_cap)
+HW_PROFILES = {
+    # Device vor dem Input anlegen; x11grab liefert CPU-Frames, die genau einmal
+    # hochgeladen werden. NV12-Konvertierung macht die GPU (scale_vaapi), kein
+    # Download zurück in den RAM.
+    "vaapi": ("h264_vaapi",
+              ("-init_hw_device","vaapi=va:/dev/dri/renderD128","-filter_hw_device","va"),
+              ("-vf","hwupload,scale_vaapi=format=nv12"),
+              # CQP kennt keinen Deckel: VBR mit Ziel- und Maximalrate
+              ("-rc_mode","VBR","-b:v","{bitrate}k","-maxrate","{maxrate}k","-bufsize","{bufsize}k")),
+    # analog: einmal per DMA hochladen, Farbkonvertierung auf der GPU.
+    # Low-Latency-Presets schalten B-Frames ohnehin ab.
+    "cuda": ("h264_nvenc",
+             ("-init_hw_device","cuda=cu:0","-filter_hw_device","cu"),
+             ("-vf","hwupload_cuda,scale_cuda=format=nv12"),
+             ("-preset","p1","-rc","vbr","-cq","23","-b:v","0",
+              "-maxrate","{maxrate}k","-bufsize","{bufsize}k","-zerolatency","1","-bf","0")),
+    # ICQ (-global_quality) ignoriert maxrate: VBR
+    "qsv": ("h264_qsv", (), (),
+            ("-b:v","{bitrate}k","-maxrate","{maxrate}k","-bufsize","{bufsize}k")),
+    # zerolatency (nie -tune film: Lookahead/mb-tree puffern Frames), keine
+    # B-Frames, ein Referenzframe; Preset und x264-params je Latenz in latency_flags
+    "software": ("libx264", (), (),
+                 ("-tune","zerolatency",
+                  "-bf","0","-refs","1","-crf","18","-maxrate","{maxrate}k","-bufsize","{bufsize}k",
+                  "-pix_fmt","yuv420p")),
+}
+
+def capture_input(display, enc_name, draw_mouse=True):
+    """
+    Liefert (capture_args, vf_override) für den Video-Input.
+    Mit VAAPI auf dem Host-Display und CAP_SYS_ADMIN: kmsgrab (DRM-PRIME dmabuf,
+    Frames verlassen die GPU nie), sonst x11grab. vf_override=None → Encoder-Filter bleibt.
+    draw_mouse=False spart x11grab das Einblenden des Cursors in jedes Frame.
+    """
+    devices = ffmpeg_caps()["devices"]
+    if (enc_name == "h264_vaapi" and display == os.environ.get("DISPLAY")
+            and (devices is None or "kmsgrab" in devices)
+            and os.access("/dev/dri/card0", os.R_OK) and has_cap_sys_admin()):
+        return (("-device","/dev/dri/card0","-f","kmsgrab","-framerate","{fps}","-i","-"),
+                ("-vf","hwmap=derive_device=vaapi,scale_vaapi=w={w}:h={h}:format=nv12"))
+    # MIT-SHM nutzt x11grab (xcb) bei lokalem Display selbst; -use_shm gibt es
+    # dort nicht mehr. Cursor ist x11grab-Input-Option, muss also vor -i stehen
+    return ("-f","x11grab","-draw_mouse","1" if draw_mouse else "0",
+            "-framerate","{fps}","-video_size","{size}","-i","{display}"), None
 
-    cmd = [
-        "ffmpeg", "-hide_banner", "-loglevel", loglevel,
+@functools.lru_cache(maxsize=None)
+def _static_cmd_template(hw, capture, vf_pre, latency, relay=False, intra_refresh=False):
+    """
+    Unveränderlicher Teil des FFmpeg-Aufrufs als Tuple. Werte, die sich pro Start
+    ändern, stehen als {loglevel} {fps} {size} {w} {h} {display} {sink} {gop} {port} drin.
+    relay=True: Ausgabe nach stdout für StreamRelay statt ffmpeg-eigenem HTTP-Server.
+    """
+    enc_name, pre_input, _, enc_defaults = HW_PROFILES[hw]
+    in_flags, out_flags, enc_flags, _ = latency_flags(latency, enc_name, 1, intra_refresh)
+
+    cmd = (
+        "ffmpeg", "-hide_banner", "-loglevel", "{loglevel}",
         # reduce frame duplication / buffering for live x11grab
         "-rtbufsize", "100M",
+        *pre_input,
         # X11 (Video)
         # NOTE: do NOT use -re for live capture; it causes timing/dup issues
+        # (-re drosselt Datei-Eingaben, x11grab taktet selbst). Große Queue
+        # fängt Bursts beim Encoder-Start ab statt Frames zu verwerfen.
+        "-thread_queue_size","4096",
         *in_flags,
-        "-f","x11grab","-framerate", str(fps),
-        "-video_size", f"{W}x{H}", "-i", display,
+        *capture,
         "-vsync", "0",
-        # Pulse (Audio)
-        "-thread_queue_size","1024",
-        "-f","pulse","-i", f"{sink_name}.monitor",
-        "-draw_mouse","1",
-        *glob_flags,
+        # Pulse (Audio) – kleine Pakete, kurze Queue reicht;
+        # fragment_size 9600 B = 50 ms bei 48 kHz/2ch/s16 (kleiner Jitter-Puffer)
+        "-thread_queue_size","64", "-fragment_size","9600",
+        *in_flags,
+        "-f","pulse","-i", "{sink}.monitor",
+        *out_flags,
         *vf_pre,
         "-c:v", enc_name,
-    ]
-
-    # Encoder Defaults
-    if enc_name == "h264_vaapi":
-        cmd += ["-qp","24"]
-    elif enc_name == "h264_nvenc":
-        cmd += ["-preset","p1","-cq","23"]
-    elif enc_name == "h264_qsv":
-        cmd += ["-global_quality","24"]
-    else:  # libx264
-        cmd += ["-preset","veryfast","-crf","18","-pix_fmt","yuv420p"]
-
-    # Latenz-spezifische Encoderflags
-    cmd += enc_flags
-
-    cmd += [
-        "-g", str(gop_use), "-keyint_min", str(gop_use),
+        *enc_defaults,
+        # Latenz-spezifische Encoderflags
+        *enc_flags,
+    )
+
+    cmd += (
+        "-g", "{gop}", "-keyint_min", "{gop}",
         "-c:a","aac","-b:a","192k",
-        "-f","mp4","-movflags","frag_keyframe+empty_moov+default_base_moof",
-        "-listen","1", f"http://0.0.0.0:{port}/"
-    ]
+        "-f","mp4",
+        *(("pipe:1",) if relay else ("-listen","1", "http://0.0.0.0:{port}/")),
+    )
     return cmd
 
+def build_ffmpeg_cmd(display, size, fps, hw, gop_s, port, loglevel, sink_name, latency, relay=False,
+                     draw_mouse=True):
+    W,H = map(int, size.split("x"))
+    gop_frames = max(int(fps*max(gop_s, 0.25)), 1)
+
+    if hw not in HW_PROFILES:
+        hw = detect_hwaccel() or "software"
+    enc_name, _, vf_pre, _ = HW_PROFILES[hw]
+    capture, vf_override = capture_input(display, enc_name, draw_mouse)
+    if vf_override:
+        vf_pre = vf_override
+    elif hw == "vaapi":
+        # ohne scale_vaapi: NV12 doch auf der CPU konvertieren, dann hochladen
+        filters = ffmpeg_caps()["filters"]
+        if filters is not None and "scale_vaapi" not in filters:
+            vf_pre = ("-vf","format=nv12,hwupload")
+    gop_override = latency_flags(latency, enc_name, gop_frames)[3]
+    gop_use = gop_override or gop_frames
+    # GOP <= 1 s: Intra-Refresh. Nicht mit Relay – Nachzügler brauchen echte Keyframes
+    intra_refresh = gop_frames <= fps and not relay
+    # VBV: 2 s Puffer normal, 1 s bei low/ultra (kleinerer Puffer = weniger Verzögerung)
+    maxrate = rate_cap(W, H, fps)
+
+    values = {
+        "loglevel": loglevel, "fps": fps, "size": f"{W}x{H}", "w": W, "h": H, "display": display,
+        "sink": sink_name, "gop": gop_use, "port": port,
+        "maxrate": maxrate, "bitrate": maxrate * 3 // 4,
+        "bufsize": maxrate * (2 if latency == "normal" else 1),
+    }
+    return [a.format_map(values)
+            for a in _static_cmd_template(hw, capture, vf_pre, latency, relay, intra_refresh)]
+
+def port_listening(port):
+    """True, wenn ein Socket im LISTEN-Zustand auf port liegt (/proc/net/tcp{,6})."""
+    hexport = f"{port:04X}"
+    for path in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(path) as f:
+                next(f)  # Header
+                for line in f:
+                    local, st = line.split()[1], line.split()[3]
+                    if st == "0A" and local.rsplit(":", 1)[1] == hexport:
+                        return True
+        except OSError:
+            pass
+    return False
+
+def wait_for_port(port, timeout=5.0):
+    # Kein Test-connect(): "-listen 1" bedient genau einen Client, ein Probe-Connect
+    # würde den Stream verbrauchen. Stattdessen den LISTEN-Socket im Kernel suchen.
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
+        if port_listening(port):
+            return True
+        time.sleep(0.02)
+    return False
+
 # -------------- Chromecast --------------
+# -------------- HTTP-Relay (--relay) --------------
+class StreamRelay:
+    """
+    Liest ffmpegs fMP4 box-weise von stdout und verteilt es per HTTP/1.1 chunked
+    mit TCP_NODELAY. ftyp+moov werden gecacht: Reconnects und weitere Clients
+    steigen am nächsten Fragment ein, das mit einem Keyframe beginnt
+    (ffmpeg -listen 1 bedient genau einen Client).
+    """
+    INIT_BOXES = (b"ftyp", b"moov")
+    FRAG_HEAD = (b"styp", b"prft")  # stehen vor dem moof eines Fragments
+    NON_SYNC = 0x10000  # sample_is_non_sync_sample in den Sample-Flags
+
+    def __init__(self, src, port):
+        self.src, self.port = src, port
+        self.init = b""
+        self.init_ready = threading.Event()
+        self.video = set()  # track_IDs der Videotracks (aus dem moov)
+        self.trex = {}      # track_ID -> default_sample_flags aus mvex/trex
+        self.clients = {}  # Queue -> schon an einem Keyframe eingestiegen?
+        self.lock = threading.Lock()
+        self.done = False  # pump() am Ende: keine neuen Clients mehr
+
+    def boxes(self):
+        read, readinto = self.src.read, self.src.readinto
+        while True:
+            hdr = read(8)
+            if len(hdr) < 8:
+                return
+            size, typ = struct.unpack(">I4s", hdr)
+            if size == 1:  # 64-bit largesize
+                ext = read(8); hdr += ext
+                size = struct.unpack(">Q", ext)[0]
+            if not size:  # Box bis EOF
+                yield typ, hdr + read()
+                return
+            # Box direkt in ihren Puffer lesen statt hdr + body zu verketten
+            box = bytearray(size)
+            box[:len(hdr)] = hdr
+            n = len(hdr) + readinto(memoryview(box)[len(hdr):])
+            yield typ, box if n == size else box[:n]
+
+    @staticmethod
+    def _children(buf, pos, end):
+        """Kind-Boxen in buf[pos:end] als (typ, Payload-Anfang, Box-Ende)."""
+        while pos + 8 <= end:
+            size, typ = struct.unpack_from(">I4s", buf, pos)
+            hdr = 8
+            if size == 1:
+                size, hdr = struct.unpack_from(">Q", buf, pos + 8)[0], 16
+            elif not size:
+                size = end - pos
+            if size < hdr:
+                return
+            yield typ, pos + hdr, min(pos + size, end)
+            pos += size
+
+    def parse_moov(self, moov):
+        """Videotracks und trex-Defaults merken, für starts_with_sync()."""
+        kids = self._children
+        for typ, p, e in kids(moov, 8, len(moov)):
+            if typ == b"trak":
+                tid, video = None, False
+                for t, q, f in kids(moov, p, e):
+                    if t == b"tkhd":  # version 1: 64-bit Zeiten vor der track_ID
+                        tid = struct.unpack_from(">I", moov, q + (20 if moov[q] == 1 else 12))[0]
+                    elif t == b"mdia":
+                        for t2, r, _ in kids(moov, q, f):
+                            if t2 == b"hdlr": video = moov[r + 8:r + 12] == b"vide"
+                if video and tid is not None:
+                    self.video.add(tid)
+            elif typ == b"mvex":
+                for t, q, _ in kids(moov, p, e):
+                    if t == b"trex":
+                        tid, flags = struct.unpack_from(">I12xI", moov, q + 4)
+                        self.trex[tid] = flags
+
+    def starts_with_sync(self, moof):
+        """
+        Beginnt das Fragment im Videotrack mit einem Sync-Sample (Keyframe)?
+        Flags des ersten Samples: trun first_sample_flags, sonst die Flags des
+        ersten trun-Eintrags, sonst tfhd default_sample_flags, sonst trex.
+        """
+        kids = self._children
+        for typ, p, e in kids(moof, 8, len(moof)):
+            if typ != b"traf":
+                continue
+            tid = flags = None
+            for t, q, _ in kids(moof, p, e):
+                tf = int.from_bytes(moof[q + 1:q + 4], "big")
+                if t == b"tfhd":
+                    tid = struct.unpack_from(">I", moof, q + 4)[0]
+                    flags = self.trex.get(tid)
+                    if tf & 0x20:  # nach base_data_offset(8) und den 4-Byte-Feldern 0x02/0x08/0x10
+                        off = q + 8 + 8 * (tf & 0x01) + 4 * bin(tf & 0x1a).count("1")
+                        flags = struct.unpack_from(">I", moof, off)[0]
+                elif t == b"trun":
+                    off = q + 8 + 4 * (tf & 0x01)  # hinter sample_count und data_offset
+                    if tf & 0x04:
+                        flags = struct.unpack_from(">I", moof, off)[0]
+                    elif tf & 0x400 and struct.unpack_from(">I", moof, q + 4)[0]:
+                        flags = struct.unpack_from(">I", moof, off + 4 * bin(tf & 0x300).count("1"))[0]
+                    break  # nur das erste Sample zählt
+            if not self.video or tid in self.video:
+                # ohne Flags wissen wir es nicht: wie bisher einsteigen lassen
+                return flags is None or not flags & self.NON_SYNC
+        return False
+
+    def pump(self):
+        head = []  # styp/prft des laufenden Fragments, für neue Clients
+        for typ, box in self.boxes():
+            if typ in self.INIT_BOXES:
+                self.init += box
+                if typ == b"moov":
+                    self.parse_moov(box)
+                    self.init_ready.set()
+                continue
+            # neue Clients erst am moof eines Keyframe-Fragments: vorher sieht
+            # der Decoder nur P-Frames ohne Referenz (graues Bild/Artefakte)
+            sync = typ == b"moof" and self.starts_with_sync(box)
+            with self.lock:
+                for q, started in list(self.clients.items()):
+                    out = [box]
+                    if not started:
+                        if not sync: continue
+                        self.clients[q] = True
+                        out = head + out
+                    try:
+                        for b in out: q.put_nowait(b)
+                    except queue.Full:
+                        # zu langsamer Client: abhängen statt ffmpeg zu stauen
+                        del self.clients[q]
+                        self._close(q)
+            head = head + [box] if typ in self.FRAG_HEAD else []
+        # EOF (ffmpeg beendet): Clients bekommen den Rest und dann das Ende
+        with self.lock:
+            self.done = True
+            clients = list(self.clients)
+            self.clients.clear()
+        for q in clients: q.put(None)
+
+    @staticmethod
+    def send_chunk(sock, data):
+        """Ein HTTP-Chunk per sendmsg (writev): Rahmen und Box ohne Verkettung."""
+        if not data:
+            return  # Chunk der Länge 0 wäre das Body-Ende
+        views = [memoryview(b"%x\r\n" % len(data)), memoryview(data), memoryview(b"\r\n")]
+        while views:
+            sent = sock.sendmsg(views)
+            while views and sent >= len(views[0]):
+                sent -= len(views[0]); views.pop(0)
+            if sent:
+                views[0] = views[0][sent:]
+
+    @staticmethod
+    def _close(q):
+        while True:
+            try: q.get_nowait()
+            except queue.Empty: break
+        q.put_nowait(None)
+
+    def serve(self):
+        relay = self
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            def log_message(self, *a): pass
+            def do_GET(self):
+                # kein Nagle: kleine Fragmente sofort raus statt bis zu 40 ms warten
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                ready = relay.init_ready.wait(timeout=10)
+                q = queue.Queue(maxsize=512)
+                with relay.lock:
+                    # ohne Init-Segment oder nach ffmpeg-Ende käme nie ein Fragment
+                    alive = ready and not relay.done
+                    if alive: relay.clients[q] = False
+                if not alive:
+                    self.send_error(503, "stream not available")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self.close_connection = True
+                sock = self.connection
+                try:
+                    relay.send_chunk(sock, relay.init)
+                    while (box := q.get()) is not None:
+                        relay.send_chunk(sock, box)
+                    sock.sendall(b"0\r\n\r\n")
+                except OSError:
+                    pass
+                finally:
+                    with relay.lock: relay.clients.pop(q, None)
+
+        srv = http.server.ThreadingHTTPServer(("0.0.0.0", self.port), Handler)
+        srv.daemon_threads = True
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        threading.Thread(target=self.pump, daemon=True).start()
+        return srv
+
+LAST_CAST_CACHE = os.path.join(os.path.dirname(FFMPEG_CAPS_CACHE), "last-cast.json")
+
+def load_last_cast(name_contains=None):
+    """Zuletzt benutzter Chromecast ({host, port, name}), falls er zum Suchbegriff passt."""
+    try:
+        with open(LAST_CAST_CACHE) as f:
+            last = json.load(f)
+        if (name_contains or "").lower() in last["name"].lower():
+            return last
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return None
+
+def save_last_cast(info):
+    name = info.friendly
+    if not name or name == "unknown":
+        # direkt per Host verbundene Casts kennen ihren Namen evtl. nicht:
+        # gespeicherten behalten, sonst scheitert beim nächsten Start der Namensabgleich
+        last = load_last_cast()
+        if not last or (last["host"], last["port"]) != (info.host, info.port):
+            return
+        name = last["name"]
+    try:
+        os.makedirs(os.path.dirname(LAST_CAST_CACHE), exist_ok=True)
+        with open(LAST_CAST_CACHE, "w") as f:
+            json.dump({"host": info.host, "port": info.port, "name": name}, f)
+    except OSError:
+        pass
+
+def cast_from_host(pychromecast, host, port=8009, timeout=5, name=None):
+    """
+    Direkter Verbindungsaufbau ohne mDNS; begrenzt, damit eine falsche IP nicht
+    ewig hängt. name (falls bekannt) wird als friendly_name übernommen.
+    Liefert None, wenn das Gerät nicht antwortet.
+    """
+    from pychromecast.error import RequestTimeout
+    if hasattr(pychromecast, "get_chromecast_from_host"):
+        cast = pychromecast.get_chromecast_from_host((host, port, None, None, name),
+                                                     tries=1, timeout=timeout)
+    else:
+        cast = pychromecast.Chromecast(host, port=port)
+    try:
+        # neuere pychromecast werfen bei Timeout statt zurückzukehren
+        cast.wait(timeout=timeout)
+        if cast.status is not None:
+            return cast
+    except RequestTimeout:
+        pass
+    # sonst versucht der Socket-Client die falsche Adresse endlos weiter
+    cast.disconnect()
+    return None
+
 def find_cast(name_contains=None, ip=None):
+    # pychromecast (zeroconf, protobuf) erst hier laden: --help und Fehlerpfade
+    # zahlen den Import nicht, und im Discovery-Thread überlappt er den Start
+    import pychromecast
     if ip:
         try:
-            cast = pychromecast.Chromecast(ip)
-            cast.wait()
-            return cast
+            cast = cast_from_host(pychromecast, ip)
+            if cast:
+                return cast
+            print("⚠️  Chromecast at IP", ip, "not responding – falling back to discovery")
         except Exception as e:
             print("⚠️  Could not connect to Chromecast at IP", ip, ":", e)
+    elif (last := load_last_cast(name_contains)):
+        # zuletzt benutztes Gerät direkt ansprechen: ein TCP-Connect statt einer
+        # frischen mDNS-Suche (neue Zeroconf-Instanz, leerer Cache) pro Start
+        try:
+            cast = cast_from_host(pychromecast, last["host"], last["port"], timeout=2,
+                                  name=last["name"])
+            if cast:
+                return cast
+        except Exception:
+            pass
+    try:
+        return browse_first_cast(pychromecast, name_contains)
+    except ImportError:
+        pass  # ältere pychromecast ohne CastBrowser: blockierende Suche
     casts, _ = pychromecast.get_chromecasts()
     if not casts:
         return None
     if name_contains:
-        for c in casts:
-            try:
-                if name_contains.lower() in c.name.lower():
+        # Suchbegriff und Namen einmal kleinschreiben, danach nur Substring-Tests
+        needle = name_contains.lower()
+        idx = [((getattr(c, "name", None) or "").lower(), c) for c in casts]
+        for name, c in idx:
+            if needle in name:
+                try:
                     c.wait(); return c
-            except Exception:
-                pass
+                except Exception:
+                    pass
     c = casts[0]; c.wait(); return c
 
+def browse_first_cast(pychromecast, name_contains=None, timeout=10):
+    """
+    mDNS-Suche per CastBrowser, die beim ersten passenden Gerät endet statt den
+    ganzen Discovery-Timeout abzuwarten. Ohne Namenstreffer: erstes gefundenes Gerät.
+    """
+    import zeroconf
+    from pychromecast.discovery import CastBrowser, SimpleCastListener
+    needle = (name_contains or "").lower()
+    hits, found = [], threading.Event()
+    def add(uuid, _service):
+        info = browser.devices.get(uuid)
+        if info and needle in (info.friendly_name or "").lower():
+            hits.append(info); found.set()
+    zconf = zeroconf.Zeroconf()
+    browser = CastBrowser(SimpleCastListener(add_callback=add), zconf)
+    browser.start_discovery()
+    cast = None
+    try:
+        found.wait(timeout)
+        info = hits[0] if hits else next(iter(list(browser.devices.values())), None)
+        if info is None:
+            return None
+        # CastInfo aus mDNS enthält nur Service-Namen: der Socket-Client löst sie
+        # (auch bei Reconnects) über zconf auf. stop_discovery() schließt zconf,
+        # also läuft der Browser bei Erfolg weiter (Daemon-Threads)
+        cast = pychromecast.get_chromecast_from_cast_info(info, zconf)
+        cast.wait(timeout=timeout)
+        return cast
+    except Exception:
+        if cast is not None:
+            cast.disconnect()
+        cast = None
+        raise
+    finally:
+        if cast is None:
+            browser.stop_discovery()
+
+@dataclass
+class CastInfo:
+    host: str
+    port: int
+    friendly: str
+
+def cast_info(c):
+    """host/port/Name einmal nach cast.wait() auflösen."""
+    host = getattr(c, "host", None) or c.socket_client.host
+    port = getattr(c, "port", None) or c.socket_client.port
+    try:
+        friendly = getattr(c, "name", None) or c.device.friendly_name
+    except Exception:
+        friendly = "unknown"
+    return CastInfo(host, port, friendly)
+
+class StatusEvent:
+    """pychromecast-Status-Listener: setzt event, sobald pred(status) zutrifft."""
+    def __init__(self, pred):
+        self.pred = pred
+        self.event = threading.Event()
+    def new_cast_status(self, status):
+        if self.pred(status): self.event.set()
+    def new_media_status(self, status):
+        if self.pred(status): self.event.set()
+    def load_media_failed(self, *_):
+        self.event.set()
+
 def same_lan(a, b):
     """Sehr einfache Heuristik: /24 Vergleich."""
     try:
@@ -518,6 +1147,51 @@ def same_lan(a, b):
     except Exception:
         return False
 
+SIOCGIFADDR = 0x8915
+
+def route_iface(dst):
+    """Interface der Route zu dst aus /proc/net/route (längster Präfix), oder None."""
+    # /proc/net/route hat Adressen in Host-Byte-Order
+    d = struct.unpack("=I", socket.inet_aton(dst))[0]
+    best = None
+    with open("/proc/net/route") as f:
+        next(f)  # Header
+        for line in f:
+            f_ = line.split()
+            iface, dest, flags = f_[0], int(f_[1], 16), int(f_[3], 16)
+            metric, mask = int(f_[6]), int(f_[7], 16)
+            if not flags & 0x1 or d & mask != dest:  # RTF_UP
+                continue
+            key = (bin(mask).count("1"), -metric)
+            if best is None or key > best[0]:
+                best = (key, iface)
+    return best[1] if best else None
+
+@functools.lru_cache(maxsize=8)
+def local_ip_for(host, port):
+    """
+    Lokale IPv4, über die host erreicht wird (pro Lauf gecacht).
+    Achtung: liefert die primäre Adresse des Interfaces. Ein abweichendes
+    "src" der Route (prefsrc) oder Policy-Routing steht nicht in
+    /proc/net/route und wird ignoriert.
+    """
+    # Routing-Tabelle lesen + Adresse des Interfaces, ohne connect()
+    try:
+        iface = route_iface(host)
+        if iface:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+                packed = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack("256s", iface[:15].encode()))
+            return socket.inet_ntoa(packed[20:24])
+    except Exception:
+        pass
+    # Fallback: UDP-connect-Trick (Kernel wählt die Quelladresse)
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect((host, port))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
 # -------------- Main --------------
 FF_PROC = None
 VIRT_PROC = None
@@ -526,6 +1200,7 @@ CAST_OBJ = None
 ATTACH_PROC = None
 XPRA_MANAGED_DISPLAY = None
 XPRA_DAEMONIZED = False
+STOP_EVT = threading.Event()
 
 def stop_everything():
     global FF_PROC, VIRT_PROC, WM_PROC, CAST_OBJ
@@ -544,34 +1219,24 @@ def stop_everything():
                 pass
     except Exception:
         pass
-    if FF_PROC and FF_PROC.poll() is None:
-        try:
-            os.killpg(os.getpgid(FF_PROC.pid), signal.SIGINT)
+    # erst alle Prozessgruppen signalisieren (FFmpeg: SIGINT für sauberes Ende),
+    # dann mit einer gemeinsamen Deadline warten und Nachzügler hart beenden
+    procs = [(p, sig) for p, sig in ((FF_PROC, signal.SIGINT), (WM_PROC, signal.SIGTERM),
+                                     (ATTACH_PROC, signal.SIGTERM), (VIRT_PROC, signal.SIGTERM))
+             if p and p.poll() is None]
+    for p, sig in procs:
+        try: os.killpg(os.getpgid(p.pid), sig)
         except Exception:
-            try: FF_PROC.terminate()
+            try: p.terminate()
             except Exception: pass
-        try: FF_PROC.wait(timeout=3)
+    deadline = time.monotonic() + 3
+    for p, _ in procs:
+        try: p.wait(timeout=max(0, deadline - time.monotonic()))
         except Exception:
-            try:
-                os.killpg(os.getpgid(FF_PROC.pid), signal.SIGKILL)
+            try: os.killpg(os.getpgid(p.pid), signal.SIGKILL)
             except Exception:
-                try: FF_PROC.kill()
+                try: p.kill()
                 except Exception: pass
-    if WM_PROC and WM_PROC.poll() is None:
-        try: os.killpg(os.getpgid(WM_PROC.pid), signal.SIGTERM)
-        except Exception: 
-            try: WM_PROC.terminate()
-            except Exception: pass
-    if ATTACH_PROC and ATTACH_PROC.poll() is None:
-        try: os.killpg(os.getpgid(ATTACH_PROC.pid), signal.SIGTERM)
-        except Exception:
-            try: ATTACH_PROC.terminate()
-            except Exception: pass
-    if VIRT_PROC and VIRT_PROC.poll() is None:
-        try: os.killpg(os.getpgid(VIRT_PROC.pid), signal.SIGTERM)
-        except Exception: 
-            try: VIRT_PROC.terminate()
-            except Exception: pass
     # If xpra was started in daemon mode, try to stop it explicitly
     try:
         if XPRA_DAEMONIZED and XPRA_MANAGED_DISPLAY:
@@ -580,11 +1245,12 @@ def stop_everything():
         pass
 
 def sig_handler(signum, frame):
-    print(f"--- cleanup (signal {signum}) ---", flush=True)
-    stop_everything()
-    print("Receiver stopped & disconnected.", flush=True)
-    print("--- cleanup done ---", flush=True)
-    sys.exit(0)
+    # nur markieren und den Hauptthread abwickeln lassen: das Cleanup (fork, pactl,
+    # quit_app) läuft dann im finally von main() statt mitten im Signal-Handler
+    if STOP_EVT.is_set():
+        return  # weiteres Ctrl+C bricht das laufende Cleanup nicht ab
+    STOP_EVT.set()
+    raise KeyboardInterrupt(signum)
 
 def main():
     global FF_PROC, VIRT_PROC, WM_PROC, CAST_OBJ
@@ -603,8 +1269,14 @@ def main():
     ap.add_argument("--gop-seconds", type=float, default=2.0)
     ap.add_argument("--fflog", default="info", choices=["quiet","error","warning","info","debug"])
     ap.add_argument("--sink-name", default="cast_sink")
+    ap.add_argument("--monitor-default", action="store_true",
+                    help="Monitor des aktuellen Default-Sinks aufnehmen statt Null-Sink (Ton bleibt lokal hörbar)")
     ap.add_argument("--latency", default="normal", choices=["normal","low","ultra"])
     ap.add_argument("--lan-only", action="store_true")
+    ap.add_argument("--relay", action="store_true",
+                    help="fMP4 über eigenen HTTP-Server (chunked, TCP_NODELAY) statt ffmpeg -listen")
+    ap.add_argument("--hide-cursor", action="store_true",
+                    help="Mauszeiger nicht ins Bild zeichnen (spart x11grab Arbeit pro Frame)")
     # virtual
     ap.add_argument("--virtual", action="store_true")
     ap.add_argument("--virtual-res", default="3840x2160")
@@ -616,18 +1288,32 @@ def main():
     ap.add_argument("--save-config", action="store_true")
     args = ap.parse_args()
 
-    # Signale
-    signal.signal(signal.SIGINT,  sig_handler)
-    signal.signal(signal.SIGTERM, sig_handler)
-
-    # setup audio
-    print("Setting up PulseAudio null sink …")
-    orig_sink, pa_idx, monitor_name = setup_null_sink(args.sink_name)
-
+    audio_sink, orig_sink, pa_idx = args.sink_name, None, None
     virt_display = args.display
     used_size = args.resolution
 
     try:
+        # Signale erst hier: sig_handler wirft KeyboardInterrupt, das Cleanup
+        # (Null-Sink zurücksetzen usw.) steht im finally unten
+        signal.signal(signal.SIGINT,  sig_handler)
+        signal.signal(signal.SIGTERM, sig_handler)
+
+        # Chromecast-Suche (mDNS, dauert Sekunden) und ffmpeg-Probe laufen parallel zu Audio/X
+        print("Discovering Chromecast …")
+        disc_fut = background(find_cast, args.device, args.ip)
+        hw_fut = background(detect_hwaccel) if args.hw == "auto" else None
+
+        # setup audio
+        default_sink = get_default_sink() if args.monitor_default else None
+        if default_sink:
+            # Monitor des aktuellen Ausgabegeräts direkt abgreifen: kein Null-Sink,
+            # kein Default-Wechsel, nichts zurückzusetzen
+            print(f"Capturing monitor of default sink {default_sink} …")
+            audio_sink = default_sink
+        else:
+            print("Setting up PulseAudio null sink …")
+            orig_sink, pa_idx, monitor_name = setup_null_sink(args.sink_name)
+
         # virtuelles Display
         if args.virtual:
             print("Starting virtual display …")
@@ -669,55 +1355,64 @@ def main():
             else:
                 print(f"⚠️  xpra display {wait_display} not registered after {waited:.1f}s — continuing startup", flush=True)
 
-        # FFmpeg Server
+        # FFmpeg Server (hw einmal auflösen, build_ffmpeg_cmd bekommt nie "auto")
+        hw = (hw_fut.result() or "software") if hw_fut else args.hw
         ff_cmd = build_ffmpeg_cmd(virt_display if args.virtual else args.display,
-                                  used_size, args.fps, args.hw, args.gop_seconds,
-                                  args.port, args.fflog, args.sink_name, args.latency)
+                                  used_size, args.fps, hw, args.gop_seconds,
+                                  args.port, args.fflog, audio_sink, args.latency,
+                                  relay=args.relay, draw_mouse=not args.hide_cursor)
         print("Starting FFmpeg …")
-        print("$", shlex_join(ff_cmd))
+        print("$", shlex.join(ff_cmd))
         # Provide XAUTHORITY to FFmpeg and other spawned clients if xpra created one
         ff_env = os.environ.copy()
         if args.virtual and 'xauth_path' in locals() and xauth_path:
             ff_env['XAUTHORITY'] = xauth_path
-        FF_PROC = subprocess.Popen(ff_cmd, env=ff_env, preexec_fn=os.setsid)
+        FF_PROC = subprocess.Popen(ff_cmd, env=ff_env, start_new_session=True,
+                                   stdout=subprocess.PIPE if args.relay else None)
+        relay = None
+        if args.relay:
+            relay = StreamRelay(FF_PROC.stdout, args.port)
+            relay.serve()
 
-        # Chromecast finden
-        print("Discovering Chromecast …")
-        CAST_OBJ = find_cast(args.device, args.ip)
+        # Chromecast-Suche abholen
+        try:
+            CAST_OBJ = disc_fut.result()
+        except Exception as e:
+            print("⚠️  Discovery failed:", e)
+            CAST_OBJ = None
         if not CAST_OBJ:
             print("⚠️  No Chromecast found.")
             raise SystemExit(2)
 
-        host = getattr(CAST_OBJ, "host", None) or CAST_OBJ.socket_client.host
-        cport = getattr(CAST_OBJ, "port", None) or CAST_OBJ.socket_client.port
-        friendly = None
-        try:
-            friendly = getattr(CAST_OBJ, "name", None) or CAST_OBJ.device.friendly_name
-        except Exception:
-            friendly = "unknown"
-        print(f"✓ Chromecast: {friendly} @ {host}:{cport}")
+        info = cast_info(CAST_OBJ)
+        print(f"✓ Chromecast: {info.friendly} @ {info.host}:{info.port}")
+        save_last_cast(info)
 
         # Receiver starten
         if args.app_id:
             print(f"Launching receiver app {args.app_id} …")
             try:
+                # statt fester Pause: warten, bis der Cast-Status die App meldet
+                app_ready = StatusEvent(lambda st: st.app_id == args.app_id)
+                CAST_OBJ.register_status_listener(app_ready)
                 CAST_OBJ.start_app(args.app_id)
-                time.sleep(1.5)
-                print("Receiver app launched.")
+                if CAST_OBJ.app_id == args.app_id or app_ready.event.wait(timeout=10):
+                    print("Receiver app launched.")
+                else:
+                    print("⚠️  Receiver app not reported as running – continuing.")
             except Exception as e:
                 print("⚠️  Error launching app:", e)
 
         # lokale IP für URL
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect((host, cport)); local_ip = s.getsockname()[0]; s.close()
+        local_ip = local_ip_for(info.host, info.port)
         url = f"http://{local_ip}:{args.port}/"
         print("Stream URL:", url)
 
         # Pfadcheck (LAN-only Hinweis)
         print("\n--- Path Check (LAN vs. Internet) ---")
         print("Server-LAN-IP:", local_ip)
-        print("Chromecast-IP:", host)
-        if same_lan(local_ip, host):
+        print("Chromecast-IP:", info.host)
+        if same_lan(local_ip, info.host):
             print("→ Chromecast verbindet wahrscheinlich direkt im LAN/WLAN.")
             ok_lan = True
         else:
@@ -729,24 +1424,39 @@ def main():
             raise SystemExit(5)
 
         # Media starten (LIVE)
+        from pychromecast.error import UnsupportedNamespace
         mc = CAST_OBJ.media_controller
         try: mc.update_status()
         except UnsupportedNamespace: pass
 
+        # erst abspielen, wenn FFmpeg wirklich lauscht – bzw. beim Relay (Port ist
+        # sofort offen), wenn die ersten Bytes (ftyp+moov) von ffmpeg da sind
+        if not (relay.init_ready.wait(timeout=5) if relay else wait_for_port(args.port)):
+            print(f"⚠️  FFmpeg liefert noch nicht auf Port {args.port} – starte trotzdem.")
+        # erster MEDIA_STATUS mit Session statt block_until_active-Polling
+        media_active = StatusEvent(lambda st: st.media_session_id is not None)
+        mc.register_status_listener(media_active)
         mc.play_media(url, "video/mp4", stream_type="LIVE")
-        mc.block_until_active(timeout=10)
+        media_active.event.wait(timeout=10)
 
         print("Streaming started. Press Ctrl+C to stop.")
-        # Haupt-Loop (warten bis Signal)
-        while True:
-            time.sleep(1)
+        # warten bis Signal oder Ende von FFmpeg (Absturz, Chromecast getrennt) –
+        # blockiert ohne periodische Wakeups
+        threading.Thread(target=lambda: (FF_PROC.wait(), STOP_EVT.set()), daemon=True).start()
+        STOP_EVT.wait()
+        if FF_PROC.poll() is not None:
+            print(f"⚠️  FFmpeg beendet (Exit {FF_PROC.returncode}) – räume auf.", flush=True)
 
-    except KeyboardInterrupt:
-        pass
+    except KeyboardInterrupt as e:
+        STOP_EVT.set()
+        print(f"--- cleanup (signal {e.args[0] if e.args else signal.SIGINT}) ---", flush=True)
     finally:
         # Cleanup
         stop_everything()
         restore_sinks(orig_sink, pa_idx)
+        if STOP_EVT.is_set():
+            print("Receiver stopped & disconnected.", flush=True)
+            print("--- cleanup done ---", flush=True)
 
 if __name__ == "__main__":
     main()
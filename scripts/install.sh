@@ -37,7 +37,10 @@ rsync -a --delete "${REPO_DIR}/" "${TARGET_DIR}/"
 echo "➡️  Create virtualenv …"
 python3 -m venv "${TARGET_DIR}/.venv"
 "${TARGET_DIR}/.venv/bin/pip" install --upgrade pip wheel
-"${TARGET_DIR}/.venv/bin/pip" install pychromecast
+"${TARGET_DIR}/.venv/bin/pip" install pychromecast pulsectl
+
+echo "➡️  Precompile bytecode …"
+"${TARGET_DIR}/.venv/bin/python" -m compileall -q "${TARGET_DIR}/python" "${TARGET_DIR}/archive"
 
 echo "➡️  Install launcher …"
 cat > "${BIN_DIR}/chromecast-streamer" <<'EOF'